@@ -1,25 +1,110 @@
+import asyncio
+import hashlib
 import os
-import sys
+import re
 import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Dict, Any
+from functools import cache
+from typing import Dict, Any, List, Optional
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+import orjson
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-
-# Add the backend directory to the path so we can import our modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi.responses import ORJSONResponse
+from opentelemetry import trace
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from starlette_prometheus import PrometheusMiddleware, metrics
 
 from app.models import (
-    QuestionRequest, QuestionResponse, IngestRequest, IngestResponse,
-    HealthResponse, ErrorResponse, Source
+    QuestionRequest, QuestionResponse, BatchQuestionRequest, BatchQuestionResponse,
+    IngestRequest, IngestResponse, IngestJob,
+    HealthResponse
 )
 from config.settings import settings
 from utils.rag_pipeline import RAGPipeline
 from utils.document_processor import DocumentProcessor
 from utils.vector_store import PineconeVectorStore
-from crawlers.run_crawler import run_crawler
+from utils.semantic_cache import SemanticCache
+from utils.http_client import close_async_http_client, close_http_client
+from utils.metadata_store import close_environments
+from utils.metrics import timed_step, record_cache_lookup
+from crawlers.run_crawler import run_crawler_async
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Validate configuration on startup and release shared clients on shutdown"""
+    try:
+        # Validate settings
+        settings.validate()
+        print("✅ MCP Q&A Chatbot API started successfully")
+        
+    except Exception as e:
+        print(f"❌ Failed to start API: {e}")
+        raise
+    
+    # Build the services once per worker here, rather than racing to create them
+    # from concurrent first requests in the threadpool
+    rag = get_rag()
+    
+    # The semantic cache is unused with integrated inference, so there is nothing to warm
+    if not settings.SKIP_WARMUP and not settings.PINECONE_INTEGRATED_INFERENCE:
+        await warm_semantic_cache(rag)
+    
+    yield
+    
+    # Services hold the shared clients and metadata store, so drop them together with them
+    await close_async_http_client()
+    close_http_client()
+    close_environments()
+    get_rag.cache_clear()
+    get_vs.cache_clear()
+
+
+async def warm_semantic_cache(rag: RAGPipeline):
+    """Answer canonical MCP questions up front so FAQ traffic hits the semantic cache"""
+    # Without indexed documents every answer lacks context and would be thrown away
+    try:
+        stats = await asyncio.to_thread(rag.vector_store.get_index_stats)
+    except Exception as e:
+        print(f"⚠️  Skipping warmup, index unavailable: {e}")
+        return
+    
+    if not stats or not stats.total_vector_count:
+        print("⚠️  Skipping warmup, index is empty")
+        return
+    
+    try:
+        with open(settings.WARMUP_QUESTIONS_FILE, 'rb') as f:
+            questions = orjson.loads(f.read())
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Skipping warmup, could not read {settings.WARMUP_QUESTIONS_FILE}: {e}")
+        return
+    
+    if not questions:
+        return
+    
+    try:
+        embeddings = await rag.vector_store.aembed_queries(questions)
+        responses = await asyncio.gather(*[
+            rag.aask(query=question, query_embedding=embedding)
+            for question, embedding in zip(questions, embeddings)
+        ])
+    except Exception as e:
+        print(f"⚠️  Warmup failed: {e}")
+        return
+    
+    warmed = 0
+    for embedding, response in zip(embeddings, responses):
+        if response["context_used"]:
+            semantic_cache.insert(embedding, response, ttl=settings.WARMUP_CACHE_TTL)
+            warmed += 1
+    
+    print(f"🔥 Warmed semantic cache with {warmed}/{len(questions)} questions")
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -27,7 +112,9 @@ app = FastAPI(
     description="Intelligent Q&A chatbot for Model Context Protocol (MCP) documentation",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -39,29 +126,138 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics at /metrics
+app.add_middleware(PrometheusMiddleware)
+app.add_route("/metrics", metrics)
+
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag each request with an id, echoed back and attached to its trace span"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    trace.get_current_span().set_attribute("request.id", request_id)
+    
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+# Tracing spans for every endpoint. Middleware added later wraps earlier middleware,
+# so this must come after request_id_middleware for its span to exist there
+FastAPIInstrumentor.instrument_app(app)
+
+
 # Global instances
-rag_pipeline = None
-vector_store = None
+semantic_cache = SemanticCache()
+exact_cache = TTLCache(maxsize=settings.EXACT_CACHE_SIZE, ttl=settings.EXACT_CACHE_TTL)
+
+
+def exact_cache_key(request: QuestionRequest) -> str:
+    """Build the exact-match cache key for a question request"""
+    payload = orjson.dumps(
+        {"q": request.question, "s": request.include_sources, "k": request.top_k},
+        option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.sha256(payload).hexdigest()
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    global rag_pipeline, vector_store
+def job_path(job_id: str) -> str:
+    """Path of the status file for an ingestion job"""
+    return os.path.join(settings.JOBS_DIR, f"{job_id}.json")
+
+
+def save_job(job: IngestJob):
+    """Persist job status on disk so every worker process can report it"""
+    os.makedirs(settings.JOBS_DIR, exist_ok=True)
+    path = job_path(job.job_id)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(job.model_dump_json())
+    os.replace(path + ".tmp", path)
+
+
+def load_job(job_id: str) -> Optional[IngestJob]:
+    """Load job status written by any worker, if it exists"""
+    # Job ids are uuid4 hex strings; anything else cannot name a job file
+    if not re.fullmatch(r"[0-9a-f]{32}", job_id) or not os.path.exists(job_path(job_id)):
+        return None
+    with open(job_path(job_id), "r", encoding="utf-8") as f:
+        job = IngestJob.model_validate_json(f.read())
+    
+    # Running jobs touch their file periodically; one that stopped was interrupted
+    idle = time.time() - os.path.getmtime(job_path(job_id))
+    if job.status in ("queued", "running") and idle > settings.INGEST_JOB_STALE_AFTER:
+        return IngestJob(job_id=job_id, status="failed", result=IngestResponse(
+            success=False,
+            message=f"Ingestion job stopped responding {idle:.0f}s ago (server restarted or crashed)",
+            documents_processed=0,
+            chunks_created=0,
+            embeddings_created=0,
+            processing_time=0.0
+        ))
+    return job
+
+
+def active_job_path() -> str:
+    """Path of the file naming the ingestion job currently queued or running"""
+    return os.path.join(settings.JOBS_DIR, "active")
+
+
+def claim_ingest(job: IngestJob) -> IngestJob:
+    """Record a job as the active ingestion, or return the job that already is"""
+    save_job(job)
+    
+    # Hard-linking a complete file is atomic and fails if another worker holds the claim
+    claim = job_path(job.job_id) + ".claim"
+    with open(claim, "w", encoding="utf-8") as f:
+        f.write(job.job_id)
     
     try:
-        # Validate settings
-        settings.validate()
-        
-        # Initialize RAG pipeline
-        rag_pipeline = RAGPipeline()
-        vector_store = PineconeVectorStore()
-        
-        print("✅ MCP Q&A Chatbot API started successfully")
-        
-    except Exception as e:
-        print(f"❌ Failed to start API: {e}")
-        raise
+        while True:
+            try:
+                os.link(claim, active_job_path())
+                return job
+            except FileExistsError:
+                pass
+            
+            try:
+                with open(active_job_path(), "r", encoding="utf-8") as f:
+                    active = load_job(f.read())
+            except FileNotFoundError:
+                continue
+            
+            if active is not None and active.status in ("queued", "running"):
+                os.remove(job_path(job.job_id))
+                return active
+            
+            # The previous job finished or went stale without releasing its claim
+            try:
+                os.remove(active_job_path())
+            except FileNotFoundError:
+                pass
+    finally:
+        os.remove(claim)
+
+
+def release_ingest(job_id: str):
+    """Drop the active-job claim if it belongs to this job"""
+    try:
+        with open(active_job_path(), "r", encoding="utf-8") as f:
+            if f.read() == job_id:
+                os.remove(active_job_path())
+    except FileNotFoundError:
+        pass
+
+
+@cache
+def get_vs() -> PineconeVectorStore:
+    """Per-process vector store, created at startup"""
+    return PineconeVectorStore()
+
+
+@cache
+def get_rag() -> RAGPipeline:
+    """Per-process RAG pipeline sharing the vector store, created at startup"""
+    return RAGPipeline(vector_store=get_vs())
 
 
 @app.get("/", response_model=Dict[str, str])
@@ -88,8 +284,7 @@ async def health_check():
         # Check if vector store is accessible
         vector_store_status = "ok"
         try:
-            if vector_store:
-                vector_store.get_index_stats()
+            await asyncio.to_thread(get_vs().get_index_stats)
         except Exception:
             vector_store_status = "error"
         
@@ -108,50 +303,206 @@ async def health_check():
 
 
 @app.post("/ask", response_model=QuestionResponse)
-async def ask_question(request: QuestionRequest):
+async def ask_question(request: QuestionRequest, rag: RAGPipeline = Depends(get_rag)):
     """Ask a question about MCP"""
     start_time = time.time()
     
     try:
-        if not rag_pipeline:
-            raise HTTPException(status_code=503, detail="RAG pipeline not initialized")
+        # Identical questions are answered straight from the exact-match cache
+        cache_key = exact_cache_key(request)
+        with timed_step("cache_lookup"):
+            cached = exact_cache.get(cache_key)
+        record_cache_lookup("exact", hit=cached is not None)
+        if cached:
+            return ORJSONResponse({**cached, "processing_time": time.time() - start_time})
         
-        # Get answer from RAG pipeline
-        response = rag_pipeline.ask(
-            query=request.question,
-            include_sources=request.include_sources
-        )
+        # Requests with an explicit top_k bypass the semantic cache, as does integrated
+        # inference since there is no local query embedding to compare
+        use_cache = request.top_k is None and not settings.PINECONE_INTEGRATED_INFERENCE
+        query_embedding = None
+        response = None
         
-        # Convert sources to Pydantic models
-        sources = None
-        if request.include_sources and response.get("sources"):
-            sources = [
-                Source(
-                    title=source["title"],
-                    url=source["url"],
-                    relevance_score=source["relevance_score"],
-                    snippet=source["snippet"]
-                )
-                for source in response["sources"]
-            ]
+        if use_cache:
+            # Embed once: the same vector serves the cache lookup and retrieval
+            query_embedding = await rag.vector_store.aembed_query(request.question)
+            with timed_step("cache_lookup"):
+                response = semantic_cache.lookup(query_embedding, include_sources=request.include_sources)
+            record_cache_lookup("semantic", hit=response is not None)
+            if response:
+                response["query"] = request.question
+        
+        if response is None:
+            # Get answer from RAG pipeline
+            response = await rag.aask(
+                query=request.question,
+                include_sources=request.include_sources,
+                top_k=request.top_k,
+                query_embedding=query_embedding
+            )
+            
+            if use_cache and response["context_used"]:
+                semantic_cache.insert(query_embedding, response, include_sources=request.include_sources)
         
         processing_time = time.time() - start_time
         
-        return QuestionResponse(
-            query=response["query"],
-            answer=response["answer"],
-            context_used=response["context_used"],
-            sources=sources,
-            processing_time=processing_time
-        )
+        result = build_question_response(response, request.include_sources, processing_time)
+        
+        if result["context_used"]:
+            exact_cache[cache_key] = result
+        
+        # Return the plain dict directly to skip re-validating it against QuestionResponse
+        return ORJSONResponse(result)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
 
-@app.post("/ingest", response_model=IngestResponse)
+@app.post("/ask/batch", response_model=BatchQuestionResponse)
+async def ask_questions(request: BatchQuestionRequest, rag: RAGPipeline = Depends(get_rag)):
+    """Ask several questions about MCP in one request"""
+    start_time = time.time()
+    
+    try:
+        # One embedding call for the whole batch, then retrieval and generation fan out
+        if settings.PINECONE_INTEGRATED_INFERENCE:
+            embeddings = [None] * len(request.questions)
+        else:
+            embeddings = await rag.vector_store.aembed_queries(request.questions)
+        responses = await asyncio.gather(*[
+            rag.aask(
+                query=question,
+                include_sources=request.include_sources,
+                query_embedding=embedding
+            )
+            for question, embedding in zip(request.questions, embeddings)
+        ])
+        
+        processing_time = time.time() - start_time
+        
+        return ORJSONResponse({
+            "results": [
+                build_question_response(response, request.include_sources, processing_time)
+                for response in responses
+            ],
+            "processing_time": processing_time
+        })
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing questions: {str(e)}")
+
+
+def build_question_response(response: Dict[str, Any], include_sources: bool,
+                            processing_time: float) -> Dict[str, Any]:
+    """Convert a RAG pipeline response into a QuestionResponse-shaped dict"""
+    # Sources already come from the pipeline as plain dicts with the Source fields
+    sources = None
+    if include_sources and response.get("sources"):
+        sources = [
+            {
+                "title": source["title"],
+                "url": source["url"],
+                "relevance_score": source["relevance_score"],
+                "snippet": source["snippet"]
+            }
+            for source in response["sources"]
+        ]
+    
+    return {
+        "query": response["query"],
+        "answer": response["answer"],
+        "context_used": response["context_used"],
+        "sources": sources,
+        "processing_time": processing_time
+    }
+
+
+@app.post("/ingest", response_model=IngestJob, status_code=202)
 async def ingest_documents(request: IngestRequest, background_tasks: BackgroundTasks):
-    """Ingest and process MCP documentation"""
+    """Start ingesting MCP documentation in the background, unless a job is already active"""
+    job_id = uuid.uuid4().hex
+    job = claim_ingest(IngestJob(job_id=job_id, status="queued"))
+    if job.job_id == job_id:
+        background_tasks.add_task(_run_ingest, job_id, request)
+    return job
+
+
+@app.get("/ingest/{job_id}", response_model=IngestJob)
+async def get_ingest_job(job_id: str):
+    """Get the status of an ingestion job"""
+    job = load_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job '{job_id}' not found")
+    return job
+
+
+async def _run_ingest(job_id: str, request: IngestRequest):
+    """Run an ingestion job and record its progress"""
+    save_job(IngestJob(job_id=job_id, status="running"))
+    heartbeat = asyncio.create_task(ingest_heartbeat(job_id))
+    try:
+        result = await ingest(request)
+        
+        # Cached answers were built from the old index; this only reaches this worker's caches,
+        # other workers expire theirs through the cache TTLs
+        if result.success and result.embeddings_created:
+            semantic_cache.clear()
+            exact_cache.clear()
+        
+        save_job(IngestJob(
+            job_id=job_id,
+            status="completed" if result.success else "failed",
+            result=result
+        ))
+    finally:
+        heartbeat.cancel()
+        release_ingest(job_id)
+
+
+async def ingest_heartbeat(job_id: str):
+    """Touch the job file while it runs so other workers can tell it is still alive"""
+    while True:
+        await asyncio.sleep(settings.INGEST_HEARTBEAT_INTERVAL)
+        os.utime(job_path(job_id))
+
+
+async def embed_and_upsert(processor: DocumentProcessor, vector_store: PineconeVectorStore,
+                           chunks: List[Dict[str, Any]]) -> int:
+    """Upsert embedding batches as they arrive, keeping only a bounded number in memory"""
+    queue = asyncio.Queue(maxsize=settings.INGEST_QUEUE_SIZE)
+    
+    async def produce():
+        await processor.aembed_chunks(chunks, queue.put)
+        for _ in range(settings.INGEST_UPSERT_WORKERS):
+            await queue.put(None)
+    
+    async def upsert_worker() -> int:
+        upserted = 0
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return upserted
+            
+            upserted += await asyncio.to_thread(vector_store.upsert_documents, batch)
+            
+            # Drop vectors once they are in Pinecone
+            for chunk in batch:
+                chunk.pop('embedding', None)
+    
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(upsert_worker()) for _ in range(settings.INGEST_UPSERT_WORKERS)]
+    try:
+        # gather raises as soon as any task fails, so a dead worker can't leave
+        # the producer blocked on a full queue
+        _, *upserted = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    
+    return sum(upserted)
+
+
+async def ingest(request: IngestRequest) -> IngestResponse:
+    """Crawl, chunk, embed and index MCP documentation"""
     start_time = time.time()
     
     try:
@@ -161,40 +512,37 @@ async def ingest_documents(request: IngestRequest, background_tasks: BackgroundT
         documents_processed = 0
         chunks_created = 0
         embeddings_created = 0
+        processor = DocumentProcessor()
         
         if should_crawl:
             # Run crawler
             print("Starting document crawling...")
-            run_crawler()
-            
-            # Load crawled documents
-            if os.path.exists(settings.DOCUMENTATION_FILE):
-                with open(settings.DOCUMENTATION_FILE, 'r', encoding='utf-8') as f:
-                    import json
-                    documents = json.load(f)
-                    documents_processed = len(documents)
+            await run_crawler_async()
         
         if request.update_embeddings:
             # Process documents
-            processor = DocumentProcessor()
-            
             if os.path.exists(settings.DOCUMENTATION_FILE):
-                documents = processor.load_documents(settings.DOCUMENTATION_FILE)
-                chunks = processor.process_documents(documents)
+                # One streaming pass both counts the documents and chunks them
+                documents_processed, chunks = await asyncio.to_thread(
+                    processor.process_file, settings.DOCUMENTATION_FILE
+                )
                 chunks_created = len(chunks)
                 
-                # Create embeddings
-                chunks_with_embeddings = processor.create_embeddings(chunks)
-                embeddings_created = len(chunks_with_embeddings)
-                
-                # Save processed data
-                processed_file = settings.DOCUMENTATION_FILE.replace('.json', '_processed.json')
-                processor.save_processed_data(chunks_with_embeddings, processed_file)
+                vector_store = get_vs()
+                await asyncio.to_thread(vector_store.create_index)
                 
-                # Update vector store
-                if vector_store:
-                    vector_store.create_index()
-                    vector_store.upsert_documents(chunks_with_embeddings)
+                if settings.PINECONE_INTEGRATED_INFERENCE:
+                    # Pinecone embeds the chunk text itself
+                    embeddings_created = await asyncio.to_thread(vector_store.upsert_documents, chunks)
+                else:
+                    # Embed and upsert as a pipeline, without the intermediate processed file
+                    embeddings_created = await embed_and_upsert(processor, vector_store, chunks)
+        
+        elif should_crawl and os.path.exists(settings.DOCUMENTATION_FILE):
+            # Count crawled documents without loading the whole file
+            documents_processed = await asyncio.to_thread(
+                processor.count_documents, settings.DOCUMENTATION_FILE
+            )
         
         processing_time = time.time() - start_time
         
@@ -222,22 +570,11 @@ async def ingest_documents(request: IngestRequest, background_tasks: BackgroundT
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
-        content=ErrorResponse(
-            error="Internal server error",
-            detail=str(exc),
-            timestamp=datetime.now().isoformat()
-        ).dict()
+        content={
+            "error": "Internal server error",
+            "detail": str(exc),
+            "timestamp": datetime.now().isoformat()
+        }
     )
-
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=True,
-        log_level="info"
-    ) 
\ No newline at end of file
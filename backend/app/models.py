@@ -1,9 +1,13 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Annotated, List, Optional, Dict, Any
+
+from config.settings import settings
 
 
 class QuestionRequest(BaseModel):
     """Request model for asking questions"""
+    model_config = ConfigDict(extra="forbid")
+
     question: str = Field(..., description="The question to ask about MCP", min_length=1)
     include_sources: bool = Field(True, description="Whether to include source information in response")
     top_k: Optional[int] = Field(None, description="Number of top results to retrieve", ge=1, le=20)
@@ -11,6 +15,8 @@ class QuestionRequest(BaseModel):
 
 class Source(BaseModel):
     """Source information for answers"""
+    model_config = ConfigDict(frozen=True)
+
     title: str
     url: str
     relevance_score: float
@@ -19,6 +25,8 @@ class Source(BaseModel):
 
 class QuestionResponse(BaseModel):
     """Response model for questions"""
+    model_config = ConfigDict(frozen=True)
+
     query: str
     answer: str
     context_used: bool
@@ -26,14 +34,36 @@ class QuestionResponse(BaseModel):
     processing_time: Optional[float] = None
 
 
+class BatchQuestionRequest(BaseModel):
+    """Request model for asking several questions at once"""
+    model_config = ConfigDict(extra="forbid")
+
+    questions: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., description="The questions to ask about MCP", min_length=1, max_length=settings.MAX_BATCH_QUESTIONS
+    )
+    include_sources: bool = Field(True, description="Whether to include source information in responses")
+
+
+class BatchQuestionResponse(BaseModel):
+    """Response model for batched questions"""
+    model_config = ConfigDict(frozen=True)
+
+    results: List[QuestionResponse]
+    processing_time: Optional[float] = None
+
+
 class IngestRequest(BaseModel):
     """Request model for ingesting documents"""
+    model_config = ConfigDict(extra="forbid")
+
     force_recrawl: bool = Field(False, description="Force recrawling even if data exists")
     update_embeddings: bool = Field(True, description="Update embeddings after crawling")
 
 
 class IngestResponse(BaseModel):
     """Response model for ingestion"""
+    model_config = ConfigDict(frozen=True)
+
     success: bool
     message: str
     documents_processed: int
@@ -42,8 +72,19 @@ class IngestResponse(BaseModel):
     processing_time: float
 
 
+class IngestJob(BaseModel):
+    """Status of a background ingestion job"""
+    model_config = ConfigDict(frozen=True)
+
+    job_id: str
+    status: str = Field(..., description="One of: queued, running, completed, failed")
+    result: Optional[IngestResponse] = None
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
+    model_config = ConfigDict(frozen=True)
+
     status: str
     timestamp: str
     version: str
@@ -52,6 +93,8 @@ class HealthResponse(BaseModel):
 
 class ErrorResponse(BaseModel):
     """Error response model"""
+    model_config = ConfigDict(frozen=True)
+
     error: str
     detail: Optional[str] = None
     timestamp: str 
\ No newline at end of file
@@ -11,24 +11,79 @@ class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL = "gpt-3.5-turbo"
     OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+    EMBEDDING_DIMENSION = 1536
+    
+    # HTTP Configuration
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 60))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 50))
     
     # Pinecone Configuration
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     PINECONE_ENV = os.getenv("PINECONE_ENV", "us-east-1-aws")
     PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "mcp-docs")
+    # Let Pinecone embed text server-side instead of calling OpenAI (needs a fresh index)
+    PINECONE_INTEGRATED_INFERENCE = os.getenv("PINECONE_INTEGRATED_INFERENCE", "").lower() in ("1", "true", "yes")
+    PINECONE_EMBED_MODEL = os.getenv("PINECONE_EMBED_MODEL", "multilingual-e5-large")
+    PINECONE_NAMESPACE = os.getenv("PINECONE_NAMESPACE", "__default__")
     
     # Server Configuration
     HOST = os.getenv("HOST", "localhost")
     PORT = int(os.getenv("PORT", 8000))
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
     
     # RAG Configuration
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
     TOP_K_RESULTS = 5
+    PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", os.cpu_count() or 1))
+    
+    # Batching Configuration
+    EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 8))
+    EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", 6))
+    EMBEDDING_JITTER = float(os.getenv("EMBEDDING_JITTER", 0.25))
+    EMBEDDING_MAX_TOKENS_PER_REQUEST = int(os.getenv("EMBEDDING_MAX_TOKENS_PER_REQUEST", 250_000))
+    EMBEDDING_MAX_ITEMS_PER_REQUEST = int(os.getenv("EMBEDDING_MAX_ITEMS_PER_REQUEST", 2048))
+    USE_BATCH_API = os.getenv("USE_BATCH_API", "").lower() in ("1", "true", "yes")
+    BATCH_API_MAX_REQUESTS = int(os.getenv("BATCH_API_MAX_REQUESTS", 50_000))
+    BATCH_API_POLL_INTERVAL = float(os.getenv("BATCH_API_POLL_INTERVAL", 30))
+    MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", 64))
+    QUERY_EMBEDDING_BATCH_SIZE = int(os.getenv("QUERY_EMBEDDING_BATCH_SIZE", 32))
+    QUERY_EMBEDDING_FLUSH_INTERVAL = float(os.getenv("QUERY_EMBEDDING_FLUSH_INTERVAL", 0.005))
+    PINECONE_MAX_CONCURRENCY = int(os.getenv("PINECONE_MAX_CONCURRENCY", 16))
+    PINECONE_MAX_RETRIES = int(os.getenv("PINECONE_MAX_RETRIES", 5))
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 4))
+    INGEST_UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", 2))
+    INGEST_HEARTBEAT_INTERVAL = float(os.getenv("INGEST_HEARTBEAT_INTERVAL", 30))
+    # Queued/running jobs without a heartbeat for this long are reported as failed
+    INGEST_JOB_STALE_AFTER = float(os.getenv("INGEST_JOB_STALE_AFTER", 300))
+    
+    # Cache Configuration
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 4096))
+    EXACT_CACHE_SIZE = int(os.getenv("EXACT_CACHE_SIZE", 1024))
+    EXACT_CACHE_TTL = int(os.getenv("EXACT_CACHE_TTL", 3600))
+    SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", 512))
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.93))
+    SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 3600))
+    
+    # Warmup Configuration
+    SKIP_WARMUP = os.getenv("SKIP_WARMUP", "").lower() in ("1", "true", "yes")
+    WARMUP_QUESTIONS_FILE = os.getenv(
+        "WARMUP_QUESTIONS_FILE",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "warmup_questions.json")
+    )
+    WARMUP_CACHE_TTL = int(os.getenv("WARMUP_CACHE_TTL", 86400))
     
     # Data paths
     DATA_DIR = "data"
-    DOCUMENTATION_FILE = os.path.join(DATA_DIR, "mcp_documentation.json")
+    DOCUMENTATION_FILE = os.path.join(DATA_DIR, "mcp_documentation.jsonl")
+    PROCESSED_FILE = os.path.join(DATA_DIR, "mcp_documentation_processed.arrow")
+    JOBS_DIR = os.path.join(DATA_DIR, "jobs")
+    # Shared by server workers in Prometheus multiprocess mode; starlette-prometheus only reads the lowercase name
+    PROMETHEUS_MULTIPROC_DIR = os.getenv("prometheus_multiproc_dir", os.path.join(DATA_DIR, "prometheus"))
+    EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(DATA_DIR, "embedding_cache"))
+    METADATA_DB_PATH = os.getenv("METADATA_DB_PATH", os.path.join(DATA_DIR, "chunks.lmdb"))
+    METADATA_DB_MAP_SIZE = int(os.getenv("METADATA_DB_MAP_SIZE", 1 << 30))
     
     # Validation
     @classmethod
@@ -1,9 +1,23 @@
 import scrapy
-import json
-import re
+import orjson
+from functools import lru_cache
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
+from config.settings import settings
 import os
+import time
+
+
+# Link filtering constants, built once instead of on every candidate link
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.zip', '.exe')
+MCP_KEYWORDS = ('model-context-protocol', 'mcp', 'context-protocol')
+CONTENT_KEYWORDS = ('docs', 'documentation', 'blog', 'news', 'research')
+
+
+@lru_cache(maxsize=8192)
+def url_netloc(url):
+    """Return the network location of a URL, caching repeated links"""
+    return urlparse(url).netloc
 
 
 class MCPSpider(scrapy.Spider):
@@ -12,90 +26,94 @@ class MCPSpider(scrapy.Spider):
     start_urls = ['https://www.anthropic.com/news/model-context-protocol']
     
     def __init__(self):
-        self.visited_urls = set()
-        self.extracted_data = []
+        self.pages_saved = 0
         self.base_domain = 'https://www.anthropic.com'
         
+        # Wall-clock snapshot at crawl start; per-page times are monotonic offsets from it
+        self.start_time = time.time()
+        self.start_monotonic = time.monotonic()
+        
+        # Pages are appended as JSON lines while crawling, so memory stays bounded
+        # and a partial crawl is still usable
+        self.output_file = settings.DOCUMENTATION_FILE
+        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        self.output = open(self.output_file, 'wb')
+        
     def parse(self, response):
         """Parse the main page and extract content"""
         # Extract text content from the page
-        soup = BeautifulSoup(response.text, 'html.parser')
+        tree = HTMLParser(response.text)
         
         # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
+        tree.strip_tags(['script', 'style'])
             
         # Extract main content
-        text_content = self.extract_text_content(soup)
+        text_content = self.extract_text_content(tree)
         
         if text_content:
             page_data = {
                 'url': response.url,
-                'title': self.extract_title(soup),
+                'title': self.extract_title(tree),
                 'text': text_content,
+                # Epoch seconds; formatted to ISO 8601 when the file is processed
                 'timestamp': self.get_timestamp()
             }
-            self.extracted_data.append(page_data)
+            self.output.write(orjson.dumps(page_data) + b'\n')
+            self.pages_saved += 1
             
         # Find and follow internal links
         links = response.css('a::attr(href)').getall()
         for link in links:
             absolute_url = urljoin(response.url, link)
             
-            # Only follow links within the same domain and related to MCP
+            # Only follow links within the same domain and related to MCP.
+            # Scrapy's dupefilter already drops requests for URLs seen before.
             if self.should_follow_link(absolute_url):
-                if absolute_url not in self.visited_urls:
-                    self.visited_urls.add(absolute_url)
-                    yield response.follow(absolute_url, self.parse)
+                yield response.follow(absolute_url, self.parse)
                     
-    def extract_text_content(self, soup):
-        """Extract clean text content from BeautifulSoup object"""
+    def extract_text_content(self, tree):
+        """Extract clean text content from a parsed HTML tree"""
         # Focus on main content areas
-        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_='content')
+        main_content = tree.css_first('main') or tree.css_first('article') or tree.css_first('div.content')
         
         if not main_content:
-            main_content = soup.find('body')
+            main_content = tree.body
             
         if main_content:
             # Remove navigation, footer, and other non-content elements
-            for element in main_content.find_all(['nav', 'footer', 'header', 'aside']):
+            for element in main_content.css('nav, footer, header, aside'):
                 element.decompose()
                 
             # Extract text and clean it
-            text = main_content.get_text(separator=' ', strip=True)
+            text = main_content.text(separator=' ', strip=True)
             
             # Clean up whitespace
-            text = re.sub(r'\s+', ' ', text)
-            text = text.strip()
-            
-            return text
+            return ' '.join(text.split())
             
         return ""
     
-    def extract_title(self, soup):
+    def extract_title(self, tree):
         """Extract page title"""
-        title = soup.find('title')
+        title = tree.css_first('title')
         if title:
-            return title.get_text().strip()
+            return title.text().strip()
         
         # Try h1 as fallback
-        h1 = soup.find('h1')
+        h1 = tree.css_first('h1')
         if h1:
-            return h1.get_text().strip()
+            return h1.text().strip()
             
         return "Untitled"
     
     def should_follow_link(self, url):
         """Determine if we should follow this link"""
-        parsed_url = urlparse(url)
-        
         # Must be same domain
-        if parsed_url.netloc != 'www.anthropic.com':
+        if url_netloc(url) != 'www.anthropic.com':
             return False
             
         # Skip certain file types
-        skip_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.gif', '.zip', '.exe']
-        if any(url.lower().endswith(ext) for ext in skip_extensions):
+        url_lower = url.lower()
+        if url_lower.endswith(SKIP_EXTENSIONS):
             return False
             
         # Skip fragments and query parameters that don't add content
@@ -103,33 +121,22 @@ class MCPSpider(scrapy.Spider):
             return False
             
         # Focus on MCP-related content
-        mcp_keywords = ['model-context-protocol', 'mcp', 'context-protocol']
-        url_lower = url.lower()
-        
-        if any(keyword in url_lower for keyword in mcp_keywords):
+        if any(keyword in url_lower for keyword in MCP_KEYWORDS):
             return True
             
         # Also include general documentation or blog posts that might reference MCP
-        content_keywords = ['docs', 'documentation', 'blog', 'news', 'research']
-        if any(keyword in url_lower for keyword in content_keywords):
+        if any(keyword in url_lower for keyword in CONTENT_KEYWORDS):
             return True
             
         return False
     
     def get_timestamp(self):
-        """Get current timestamp"""
-        from datetime import datetime
-        return datetime.now().isoformat()
+        """Get current timestamp as epoch seconds"""
+        return self.start_time + (time.monotonic() - self.start_monotonic)
     
     def closed(self, reason):
-        """Called when spider is closed - save data to JSON file"""
-        output_file = os.path.join('data', 'mcp_documentation.json')
-        
-        # Create data directory if it doesn't exist
-        os.makedirs('data', exist_ok=True)
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.extracted_data, f, indent=2, ensure_ascii=False)
+        """Called when spider is closed - flush the JSONL output file"""
+        self.output.close()
             
-        self.logger.info(f"Saved {len(self.extracted_data)} pages to {output_file}")
-        print(f"Crawling completed. Saved {len(self.extracted_data)} pages to {output_file}") 
\ No newline at end of file
+        self.logger.info(f"Saved {self.pages_saved} pages to {self.output_file}")
+        print(f"Crawling completed. Saved {self.pages_saved} pages to {self.output_file}") 
\ No newline at end of file
@@ -2,6 +2,7 @@
 """
 Script to run the MCP documentation crawler
 """
+import asyncio
 import os
 import sys
 from scrapy.crawler import CrawlerProcess
@@ -40,5 +41,25 @@ def run_crawler():
     process.start()
 
 
+async def run_crawler_async():
+    """Run the crawler in a child process without blocking the event loop.
+    
+    CrawlerProcess installs a Twisted reactor that can only be started once per
+    process, so crawls triggered from the API run in a fresh interpreter.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [backend_dir, env.get('PYTHONPATH')]))
+    
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'crawlers.run_crawler',
+        env=env
+    )
+    returncode = await process.wait()
+    
+    if returncode != 0:
+        raise RuntimeError(f"Crawler exited with status {returncode}")
+
+
 if __name__ == "__main__":
     run_crawler() 
\ No newline at end of file
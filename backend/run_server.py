@@ -2,23 +2,60 @@
 """
 Script to run the MCP Q&A Chatbot API server
 """
+import argparse
+import os
+import shutil
 import uvicorn
 from config.settings import settings
 
 def main():
     """Run the FastAPI server"""
+    parser = argparse.ArgumentParser(description="Run the MCP Q&A Chatbot API server")
+    parser.add_argument("--dev", action="store_true", help="Auto-reload on code changes with a single worker")
+    args = parser.parse_args()
+    
     print("🚀 Starting MCP Q&A Chatbot API server...")
     print(f"📍 Server will be available at: http://{settings.HOST}:{settings.PORT}")
     print(f"📚 API documentation at: http://{settings.HOST}:{settings.PORT}/docs")
     print(f"🔧 Alternative docs at: http://{settings.HOST}:{settings.PORT}/redoc")
     
+    if args.dev:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            loop="auto",
+            http="auto",
+            reload=True,
+            log_level="info"
+        )
+        return
+    
+    # "auto" picks uvloop and httptools (C implementations of the event loop and HTTP
+    # parser) when installed and falls back to asyncio/h11 otherwise, e.g. on Windows;
+    # several workers spread requests over all CPUs
+    print(f"⚙️  Workers: {settings.WEB_CONCURRENCY}")
+    
+    # Every worker warms its own cache, so with several workers warmup is opt-in
+    # (SKIP_WARMUP=false); workers inherit this environment
+    if settings.WEB_CONCURRENCY > 1:
+        os.environ.setdefault("SKIP_WARMUP", "true")
+        
+        # Each worker has its own metrics registry; in multiprocess mode they all write to one
+        # directory that /metrics aggregates. Stale files from a previous run are cleared first
+        os.environ["prometheus_multiproc_dir"] = settings.PROMETHEUS_MULTIPROC_DIR
+        shutil.rmtree(settings.PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(settings.PROMETHEUS_MULTIPROC_DIR)
+    
     uvicorn.run(
         "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True,
+        loop="auto",
+        http="auto",
+        workers=settings.WEB_CONCURRENCY,
         log_level="info"
     )
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
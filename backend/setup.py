@@ -0,0 +1,17 @@
+from setuptools import Extension, setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+# The compiled chunker is optional: without Cython or a C compiler the pure-Python
+# implementation in utils.document_processor is used instead
+ext_modules = []
+if cythonize is not None:
+    ext_modules = cythonize(
+        [Extension("utils.fastchunk", ["utils/fastchunk.pyx"], optional=True)],
+        language_level=3
+    )
+
+setup(ext_modules=ext_modules)
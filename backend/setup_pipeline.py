@@ -13,6 +13,7 @@ import time
 from config.settings import settings
 from crawlers.run_crawler import run_crawler
 from utils.document_processor import DocumentProcessor
+from utils.http_client import install_uvloop
 from utils.vector_store import PineconeVectorStore
 
 
@@ -56,7 +57,7 @@ def setup_pipeline():
         print(f"✅ Created {len(chunks_with_embeddings)} embeddings")
         
         # Save processed data
-        processed_file = settings.DOCUMENTATION_FILE.replace('.json', '_processed.json')
+        processed_file = settings.PROCESSED_FILE
         processor.save_processed_data(chunks_with_embeddings, processed_file)
         print(f"💾 Saved processed data to {processed_file}")
         
@@ -99,6 +100,7 @@ def main():
         print("🔑 Make sure to add your OpenAI and Pinecone API keys")
         sys.exit(1)
     
+    install_uvloop()
     setup_pipeline()
 
 
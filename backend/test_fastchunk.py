@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Check that the compiled fastchunk module matches the pure-Python cleaning and chunking
+"""
+import random
+import sys
+import unittest
+from unittest import mock
+
+from utils import document_processor
+
+try:
+    from utils import fastchunk
+except ImportError:
+    fastchunk = None
+
+# Characters the cleaning and chunking code treats specially, plus some that are easy to get wrong
+SPECIAL_CHARS = list("ab_9 .!?,;:-()@#[]\n\t\r\x0b\x0c\x1c\x85  　é²½٣́😀𝟘")
+ITERATIONS = 20000
+
+
+def random_text(rng: random.Random) -> str:
+    """Short text mixing special characters with arbitrary code points"""
+    chars = []
+    for _ in range(rng.randint(0, 30)):
+        if rng.random() < 0.8:
+            chars.append(rng.choice(SPECIAL_CHARS))
+        else:
+            # Any code point except surrogates, which cannot appear in valid text
+            code = rng.randint(0, sys.maxunicode)
+            chars.append(chr(code) if not 0xD800 <= code <= 0xDFFF else " ")
+    return "".join(chars)
+
+
+@unittest.skipIf(fastchunk is None, "fastchunk extension is not built")
+class FastchunkParityTest(unittest.TestCase):
+    """Compiled and pure-Python implementations must produce identical output"""
+
+    def test_clean_text(self):
+        rng = random.Random(0)
+        for _ in range(ITERATIONS):
+            text = random_text(rng)
+            with mock.patch.object(document_processor, "fastchunk", None):
+                expected = document_processor.clean_text(text)
+            self.assertEqual(fastchunk.clean_text(text), expected, repr(text))
+
+    def test_chunk_spans(self):
+        rng = random.Random(1)
+        for _ in range(ITERATIONS):
+            text = random_text(rng)
+            chunk_size = rng.randint(1, 12)
+            overlap = rng.randint(0, chunk_size // 2)
+            with mock.patch.object(document_processor, "fastchunk", None):
+                expected = document_processor.chunk_spans(text, chunk_size, overlap)
+            self.assertEqual(fastchunk.chunk_spans(text, chunk_size, overlap), expected, repr(text))
+            self.assertEqual(
+                fastchunk.chunk_text(text, chunk_size, overlap),
+                [text[start:end] for start, end in expected]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
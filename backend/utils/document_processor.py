@@ -1,154 +1,560 @@
-import json
+import asyncio
+import hashlib
+import multiprocessing
+import random
 import re
-from typing import List, Dict, Any
-from openai import OpenAI
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import cache
+from typing import List, Dict, Any, Awaitable, Callable, Iterable, Iterator, Tuple
+
+import diskcache
+import ijson
+import numpy as np
+import orjson
+import pyarrow as pa
+import tiktoken
+from openai import (
+    OpenAI, AsyncOpenAI, RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+)
+from tenacity import (
+    retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+)
 from config.settings import settings
+from utils.http_client import get_http_client, get_async_http_client, install_uvloop
+
+try:
+    # Compiled cleaning/chunking loops, built when Cython and a C compiler are available
+    from utils import fastchunk
+except ImportError:
+    fastchunk = None
+
+
+# Errors worth retrying an embedding request for
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+@cache
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """Tokenizer for an embedding model, loaded once per process"""
+    return tiktoken.encoding_for_model(model)
+
+
+# Whitespace other than a lone space, or a single disallowed character; both become one space
+CLEAN_TEXT_RE = re.compile(r'\s{2,}|[^\S ]|[^\w\s.,!?;:\-()]')
+# Runs of sentence punctuation; the last mark is kept
+REPEATED_PUNCTUATION_RE = re.compile(r'[.!?]+([.!?])')
+
+
+def pack_embedding(embedding: List[float]) -> bytes:
+    """Serialize an embedding as float16 bytes (3 KB for 1536 dims instead of 6 KB as float32)"""
+    return np.asarray(embedding, dtype=np.float16).tobytes()
+
+
+def unpack_embedding(data: bytes) -> List[float]:
+    """Deserialize pack_embedding output back to float32 values"""
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32).tolist()
+
+
+# Columns of the processed file; embeddings are stored as fixed-size float16 vectors
+PROCESSED_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('text', pa.large_string()),
+    ('url', pa.string()),
+    ('title', pa.string()),
+    ('chunk_index', pa.int32()),
+    ('total_chunks', pa.int32()),
+    ('timestamp', pa.string()),
+    ('word_count', pa.int32()),
+    ('token_count', pa.int32()),
+    ('embedding', pa.list_(pa.float16(), settings.EMBEDDING_DIMENSION)),
+])
+
+# Rows per record batch written to the processed file
+PROCESSED_BATCH_SIZE = 4096
+
+
+def chunks_to_record_batch(chunks: List[Dict[str, Any]]) -> pa.RecordBatch:
+    """Convert chunks to a record batch matching PROCESSED_SCHEMA"""
+    columns = [
+        pa.array([chunk.get(field.name) for chunk in chunks], type=field.type)
+        for field in PROCESSED_SCHEMA if field.name != 'embedding'
+    ]
+    
+    embeddings = np.asarray([chunk['embedding'] for chunk in chunks], dtype=np.float16)
+    columns.append(pa.FixedSizeListArray.from_arrays(
+        pa.array(embeddings.reshape(-1)), settings.EMBEDDING_DIMENSION
+    ))
+    
+    return pa.RecordBatch.from_arrays(columns, schema=PROCESSED_SCHEMA)
+
+
+def record_batch_to_chunks(batch: pa.RecordBatch) -> List[Dict[str, Any]]:
+    """Convert a processed-file record batch back to chunks with float32 embeddings"""
+    embeddings = batch.column('embedding').flatten().to_numpy().astype(np.float32)
+    embeddings = embeddings.reshape(-1, settings.EMBEDDING_DIMENSION).tolist()
+    
+    chunks = batch.drop_columns(['embedding']).to_pylist()
+    for chunk, embedding in zip(chunks, embeddings):
+        chunk['embedding'] = embedding
+    return chunks
+
+
+def embedding_cache_key(text: str) -> Tuple[str, str]:
+    """Cache key for a text's embedding; includes the model so switching models misses"""
+    return settings.OPENAI_EMBEDDING_MODEL, hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def wait_for_retry(retry_state) -> float:
+    """Honor the server's Retry-After header, else back off exponentially with jitter"""
+    error = retry_state.outcome.exception()
+    response = getattr(error, 'response', None)
+    retry_after = response.headers.get('retry-after') if response is not None else None
+    
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return wait_random_exponential(multiplier=1, max=60)(retry_state)
+
+
+def clean_text(text: str) -> str:
+    """Clean and normalize text"""
+    if fastchunk is not None:
+        return fastchunk.clean_text(text)
+    
+    # Collapse whitespace and drop special characters in one scan, then squash punctuation
+    text = CLEAN_TEXT_RE.sub(' ', text)
+    return REPEATED_PUNCTUATION_RE.sub(r'\1', text).strip()
+
+
+def chunk_spans(text: str, chunk_size: int = None, overlap: int = None) -> List[Tuple[int, int]]:
+    """Split text into overlapping (start, end) spans with surrounding whitespace trimmed"""
+    if chunk_size is None:
+        chunk_size = settings.CHUNK_SIZE
+    if overlap is None:
+        overlap = settings.CHUNK_OVERLAP
+    
+    if fastchunk is not None:
+        return fastchunk.chunk_spans(text, chunk_size, overlap)
+    
+    if len(text) <= chunk_size:
+        return [(0, len(text))]
+    
+    spans = []
+    start = 0
+    
+    while start < len(text):
+        end = start + chunk_size
+        
+        # Try to break at sentence boundaries
+        if end < len(text):
+            # Only breaks in the second half of the window are accepted, so only scan that
+            boundary = start + chunk_size // 2 + 1
+            sentence_end = text.rfind('.', boundary, end)
+            if sentence_end != -1:
+                end = sentence_end + 1
+            else:
+                # Look for word boundaries
+                word_end = text.rfind(' ', boundary, end)
+                if word_end != -1:
+                    end = word_end
+        
+        # Trim surrounding whitespace by moving the span rather than slicing and stripping
+        chunk_start, chunk_end = start, min(end, len(text))
+        while chunk_start < chunk_end and text[chunk_start].isspace():
+            chunk_start += 1
+        while chunk_end > chunk_start and text[chunk_end - 1].isspace():
+            chunk_end -= 1
+        if chunk_start < chunk_end:
+            spans.append((chunk_start, chunk_end))
+        
+        start = end - overlap
+        if start >= len(text):
+            break
+    
+    return spans
+
+
+def chunk_text(text: str, chunk_size: int = None, overlap: int = None) -> List[str]:
+    """Split text into chunks with overlap"""
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, overlap)]
+
+
+def process_document(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Clean and chunk one document; a module-level function so worker processes can run it"""
+    text = doc.get('text', '')
+    if not text:
+        return []
+    
+    # The crawler records epoch seconds; older files already hold ISO strings
+    timestamp = doc.get('timestamp', '')
+    if timestamp and not isinstance(timestamp, str):
+        timestamp = datetime.fromtimestamp(float(timestamp)).isoformat()
+    
+    # Clean the text
+    text = clean_text(text)
+    
+    # Chunk the text
+    chunks = chunk_text(text)
+    
+    # Create chunk objects with metadata
+    chunk_objects = [
+        {
+            'id': f"{doc['url']}#chunk_{i}",
+            'text': chunk,
+            'url': doc['url'],
+            'title': doc.get('title', 'Untitled'),
+            'chunk_index': i,
+            'total_chunks': len(chunks),
+            'timestamp': timestamp,
+            # Approximate: whitespace runs are collapsed, but each special character removed
+            # by clean_text leaves its own space, so "a © b" counts as four words
+            'word_count': chunk.count(' ') + 1
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+    
+    # Count tokens here, in the worker, so embedding batches can be packed without re-encoding.
+    # With integrated inference Pinecone embeds the text itself and the counts are unused
+    if not settings.PINECONE_INTEGRATED_INFERENCE:
+        encoding = get_encoding(settings.OPENAI_EMBEDDING_MODEL)
+        for chunk, tokens in zip(chunk_objects, encoding.encode_ordinary_batch(chunks)):
+            chunk['token_count'] = len(tokens)
+    
+    return chunk_objects
 
 
 class DocumentProcessor:
     """Process and chunk documents for embedding"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = OpenAI(api_key=settings.OPENAI_API_KEY, http_client=get_http_client())
+        # Retries are handled by tenacity so Retry-After is honored per batch
+        self.async_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=0,
+            http_client=get_async_http_client()
+        )
+        self.cache = diskcache.Cache(settings.EMBEDDING_CACHE_DIR)
         
     def load_documents(self, file_path: str) -> List[Dict[str, Any]]:
-        """Load documents from JSON file"""
+        """Load documents from a JSON or JSONL file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                documents = json.load(f)
-            return documents
+            if file_path.endswith('.jsonl'):
+                return list(self.iter_documents(file_path))
+            with open(file_path, 'rb') as f:
+                return orjson.loads(f.read())
         except FileNotFoundError:
             print(f"File not found: {file_path}")
             return []
-        except json.JSONDecodeError:
+        except (orjson.JSONDecodeError, ijson.JSONError):
             print(f"Invalid JSON in file: {file_path}")
             return []
     
+    def iter_documents(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """Stream documents one at a time from a JSONL or JSON array file"""
+        with open(file_path, 'rb') as f:
+            if file_path.endswith('.jsonl'):
+                for line in f:
+                    if line.strip():
+                        yield orjson.loads(line)
+            else:
+                yield from ijson.items(f, 'item')
+    
+    def count_documents(self, file_path: str) -> int:
+        """Count the documents in a JSONL or JSON array file without materializing them"""
+        with open(file_path, 'rb') as f:
+            if file_path.endswith('.jsonl'):
+                return sum(1 for line in f if line.strip())
+            return sum(
+                1 for prefix, event, _ in ijson.parse(f)
+                if prefix == 'item' and event == 'start_map'
+            )
+    
     def chunk_text(self, text: str, chunk_size: int = None, overlap: int = None) -> List[str]:
         """Split text into chunks with overlap"""
-        if chunk_size is None:
-            chunk_size = settings.CHUNK_SIZE
-        if overlap is None:
-            overlap = settings.CHUNK_OVERLAP
-            
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        start = 0
-        
-        while start < len(text):
-            end = start + chunk_size
-            
-            # Try to break at sentence boundaries
-            if end < len(text):
-                # Look for sentence endings within the last 100 characters
-                sentence_end = text.rfind('.', start, end)
-                if sentence_end > start + chunk_size // 2:
-                    end = sentence_end + 1
-                else:
-                    # Look for word boundaries
-                    word_end = text.rfind(' ', start, end)
-                    if word_end > start + chunk_size // 2:
-                        end = word_end
-            
-            chunk = text[start:end].strip()
-            if chunk:
-                chunks.append(chunk)
-            
-            start = end - overlap
-            if start >= len(text):
-                break
-                
-        return chunks
+        return chunk_text(text, chunk_size, overlap)
     
-    def process_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Process documents into chunks with metadata"""
+    def process_documents(self, documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process documents into chunks with metadata, spread across worker processes"""
         processed_chunks = []
         
-        for doc in documents:
-            text = doc.get('text', '')
-            if not text:
-                continue
-                
-            # Clean the text
-            text = self.clean_text(text)
-            
-            # Chunk the text
-            chunks = self.chunk_text(text)
-            
-            # Create chunk objects with metadata
-            for i, chunk in enumerate(chunks):
-                chunk_data = {
-                    'id': f"{doc['url']}#chunk_{i}",
-                    'text': chunk,
-                    'url': doc['url'],
-                    'title': doc.get('title', 'Untitled'),
-                    'chunk_index': i,
-                    'total_chunks': len(chunks),
-                    'timestamp': doc.get('timestamp', ''),
-                    'word_count': len(chunk.split())
-                }
-                processed_chunks.append(chunk_data)
+        if settings.PROCESSING_WORKERS <= 1:
+            for doc in documents:
+                processed_chunks.extend(process_document(doc))
+            return processed_chunks
+        
+        # Spawn rather than fork: the API runs this from a threaded worker, and forked
+        # children would inherit its locks and open LMDB/diskcache handles
+        with multiprocessing.get_context("spawn").Pool(settings.PROCESSING_WORKERS) as pool:
+            for chunks in pool.imap(process_document, documents, chunksize=16):
+                processed_chunks.extend(chunks)
         
         return processed_chunks
     
+    def process_file(self, file_path: str) -> Tuple[int, List[Dict[str, Any]]]:
+        """Stream a documentation file into chunks, returning (documents read, chunks)"""
+        documents_read = 0
+        
+        def counted_documents() -> Iterator[Dict[str, Any]]:
+            nonlocal documents_read
+            for doc in self.iter_documents(file_path):
+                documents_read += 1
+                yield doc
+        
+        chunks = self.process_documents(counted_documents())
+        return documents_read, chunks
+    
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        return clean_text(text)
+    
+    def create_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create embeddings for text chunks"""
+        return asyncio.run(self.acreate_embeddings(chunks))
+    
+    @retry(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        wait=wait_for_retry,
+        stop=stop_after_attempt(settings.EMBEDDING_MAX_RETRIES),
+        reraise=True
+    )
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, retrying rate limits and transient errors"""
+        response = await self.async_client.embeddings.create(
+            model=settings.OPENAI_EMBEDDING_MODEL,
+            input=texts
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    def count_tokens(self, chunks: List[Dict[str, Any]]):
+        """Fill in token_count for chunks that were not counted during processing"""
+        uncounted = [chunk for chunk in chunks if 'token_count' not in chunk]
+        if not uncounted:
+            return
         
-        # Remove special characters that might interfere with processing
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)]', ' ', text)
+        encoding = get_encoding(settings.OPENAI_EMBEDDING_MODEL)
+        for chunk, tokens in zip(uncounted, encoding.encode_ordinary_batch([chunk['text'] for chunk in uncounted])):
+            chunk['token_count'] = len(tokens)
+    
+    def pack_batches(self, chunks: List[Dict[str, Any]], order: List[int]) -> List[Tuple[List[int], List[str]]]:
+        """Greedily pack chunk texts (in the given order) into requests bounded by tokens and items"""
+        self.count_tokens([chunks[i] for i in order])
+        
+        batches = []
+        indices, batch_texts, batch_tokens = [], [], 0
+        for i in order:
+            token_count = chunks[i]['token_count']
+            if indices and (batch_tokens + token_count > settings.EMBEDDING_MAX_TOKENS_PER_REQUEST
+                            or len(indices) >= settings.EMBEDDING_MAX_ITEMS_PER_REQUEST):
+                batches.append((indices, batch_texts))
+                indices, batch_texts, batch_tokens = [], [], 0
+            
+            indices.append(i)
+            batch_texts.append(chunks[i]['text'])
+            batch_tokens += token_count
         
-        # Remove multiple consecutive punctuation
-        text = re.sub(r'([.!?]){2,}', r'\1', text)
+        if indices:
+            batches.append((indices, batch_texts))
         
-        return text.strip()
+        return batches
     
-    def create_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Create embeddings for text chunks"""
+    def find_cached_embeddings(self, chunks: List[Dict[str, Any]]) -> Tuple[List[Tuple[str, str]], List[int], Dict[Tuple[str, str], List[int]]]:
+        """Find which chunks have cached embeddings, without reading them, and group the rest by identical text"""
+        keys = [embedding_cache_key(chunk['text']) for chunk in chunks]
+        
+        # Reuse embeddings from previous runs; identical uncached texts are embedded once
+        hits = []
+        misses: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for i, key in enumerate(keys):
+            if key not in misses and key in self.cache:
+                hits.append(i)
+            else:
+                misses[key].append(i)
+        
+        print(f"Found {len(hits)} cached embeddings, requesting {len(misses)} unique texts")
+        
+        return keys, hits, misses
+    
+    def load_cached_embeddings(self, chunks: List[Dict[str, Any]], keys: List[Tuple[str, str]], indices: List[int],
+                               misses: Dict[Tuple[str, str], List[int]]) -> List[Dict[str, Any]]:
+        """Fill embeddings for cache hits; entries evicted since the lookup are added to misses"""
+        ready = []
+        for i in indices:
+            data = self.cache.get(keys[i])
+            if data is None:
+                misses[keys[i]].append(i)
+            else:
+                chunks[i]['embedding'] = unpack_embedding(data)
+                ready.append(chunks[i])
+        return ready
+    
+    async def acreate_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create embeddings for text chunks with a bounded number of concurrent batches"""
+        async def ignore(batch: List[Dict[str, Any]]):
+            pass
+        
+        await self.aembed_chunks(chunks, ignore)
+        return chunks
+    
+    async def aembed_chunks(self, chunks: List[Dict[str, Any]],
+                            on_batch: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        """Embed chunks, awaiting on_batch with each group of chunks as soon as its embeddings are ready"""
+        if settings.USE_BATCH_API:
+            await on_batch(await asyncio.to_thread(self.create_embeddings_via_batch_api, chunks))
+            return
+        
         print(f"Creating embeddings for {len(chunks)} chunks...")
         
-        # Extract texts for embedding
         texts = [chunk['text'] for chunk in chunks]
+        keys, hits, misses = self.find_cached_embeddings(chunks)
         
-        # Create embeddings in batches
-        batch_size = 100
-        embeddings = []
+        # Cached chunks are read and handed off a slice at a time, so on_batch's backpressure
+        # bounds them too instead of the whole corpus being unpacked up front
+        for start in range(0, len(hits), settings.EMBEDDING_MAX_ITEMS_PER_REQUEST):
+            cached = self.load_cached_embeddings(
+                chunks, keys, hits[start:start + settings.EMBEDDING_MAX_ITEMS_PER_REQUEST], misses
+            )
+            if cached:
+                await on_batch(cached)
         
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            print(f"Processing batch {i//batch_size + 1}/{(len(texts) + batch_size - 1)//batch_size}")
-            
-            try:
-                response = self.client.embeddings.create(
-                    model=settings.OPENAI_EMBEDDING_MODEL,
-                    input=batch_texts
-                )
+        # Batch texts of similar length together; embeddings are scattered back below
+        order = sorted((indices[0] for indices in misses.values()), key=lambda i: len(texts[i]))
+        
+        # Create embeddings in token-budgeted batches
+        batches = self.pack_batches(chunks, order)
+        total_batches = len(batches)
+        semaphore = asyncio.Semaphore(settings.EMBEDDING_MAX_CONCURRENCY)
+        
+        async def embed_batch(n: int, indices: List[int], batch_texts: List[str]):
+            async with semaphore:
+                # Stagger requests so batches don't hit the API in lockstep
+                await asyncio.sleep(random.uniform(0, settings.EMBEDDING_JITTER))
+                print(f"Processing batch {n + 1}/{total_batches} ({len(batch_texts)} texts)")
+                
+                try:
+                    embeddings = await self.aembed_texts(batch_texts)
+                    
+                    with self.cache.transact():
+                        for i, embedding in zip(indices, embeddings):
+                            self.cache.set(keys[i], pack_embedding(embedding))
+                    
+                except Exception as e:
+                    print(f"Error creating embeddings for batch {n + 1}: {e}")
+                    # Add zero embeddings as fallback
+                    embeddings = [[0.0] * 1536 for _ in batch_texts]
                 
-                batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
+                # Combine chunks with embeddings, fanning out duplicates
+                ready = []
+                for pos, embedding in zip(indices, embeddings):
+                    for duplicate in misses[keys[pos]]:
+                        chunks[duplicate]['embedding'] = embedding
+                        ready.append(chunks[duplicate])
                 
-            except Exception as e:
-                print(f"Error creating embeddings for batch {i//batch_size + 1}: {e}")
-                # Add zero embeddings as fallback
-                embeddings.extend([[0.0] * 1536 for _ in batch_texts])
+                # Handing off while holding the semaphore applies backpressure to new requests
+                await on_batch(ready)
+        
+        await asyncio.gather(*[
+            embed_batch(n, indices, batch_texts) for n, (indices, batch_texts) in enumerate(batches)
+        ])
+        
+        print(f"Created {len(chunks)} embeddings")
+    
+    def create_embeddings_via_batch_api(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create embeddings through the OpenAI Batch API (half price, completes within 24h)"""
+        print(f"Creating embeddings for {len(chunks)} chunks via the Batch API...")
+        
+        keys, hits, misses = self.find_cached_embeddings(chunks)
+        self.load_cached_embeddings(chunks, keys, hits, misses)
+        pending = [indices[0] for indices in misses.values()]
+        
+        embeddings = {}
+        for start in range(0, len(pending), settings.BATCH_API_MAX_REQUESTS):
+            embeddings.update(self.run_embedding_batch(chunks, pending[start:start + settings.BATCH_API_MAX_REQUESTS]))
         
-        # Combine chunks with embeddings
-        for chunk, embedding in zip(chunks, embeddings):
-            chunk['embedding'] = embedding
+        with self.cache.transact():
+            for i, embedding in embeddings.items():
+                self.cache.set(keys[i], pack_embedding(embedding))
         
-        print(f"Created {len(embeddings)} embeddings")
+        # Fan results out to duplicates; failed requests fall back to zero embeddings
+        for indices in misses.values():
+            embedding = embeddings.get(indices[0], [0.0] * 1536)
+            for i in indices:
+                chunks[i]['embedding'] = embedding
+        
+        print(f"Created {len(chunks)} embeddings")
         return chunks
     
-    def save_processed_data(self, chunks: List[Dict[str, Any]], output_file: str):
-        """Save processed chunks to JSON file"""
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
+    def run_embedding_batch(self, chunks: List[Dict[str, Any]], indices: List[int]) -> Dict[int, List[float]]:
+        """Submit one Batch API job for the given chunks and wait for its embeddings"""
+        requests = b''.join(
+            orjson.dumps({
+                'custom_id': str(i),
+                'method': 'POST',
+                'url': '/v1/embeddings',
+                'body': {'model': settings.OPENAI_EMBEDDING_MODEL, 'input': chunks[i]['text']}
+            }) + b'\n'
+            for i in indices
+        )
         
-        print(f"Saved {len(chunks)} processed chunks to {output_file}")
-
+        input_file = self.client.files.create(file=('embeddings.jsonl', requests), purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint='/v1/embeddings',
+            completion_window='24h'
+        )
+        print(f"Submitted batch {batch.id} with {len(indices)} requests")
+        
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            time.sleep(settings.BATCH_API_POLL_INTERVAL)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        if not batch.output_file_id:
+            print(f"Batch {batch.id} {batch.status} without output")
+            return {}
+        
+        embeddings = {}
+        for line in self.client.files.content(batch.output_file_id).content.splitlines():
+            result = orjson.loads(line)
+            response = result.get('response') or {}
+            if response.get('status_code') == 200:
+                embeddings[int(result['custom_id'])] = response['body']['data'][0]['embedding']
+        
+        print(f"Batch {batch.id} {batch.status}: {len(embeddings)}/{len(indices)} embeddings")
+        return embeddings
+    
+    def save_processed_data(self, chunks: Iterable[Dict[str, Any]], output_file: str):
+        """Stream chunks to an Arrow IPC file in record batches, with float16 embeddings"""
+        saved = 0
+        
+        with pa.OSFile(output_file, 'wb') as f, pa.ipc.new_file(f, PROCESSED_SCHEMA) as writer:
+            batch = []
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= PROCESSED_BATCH_SIZE:
+                    writer.write_batch(chunks_to_record_batch(batch))
+                    saved += len(batch)
+                    batch = []
+            
+            if batch:
+                writer.write_batch(chunks_to_record_batch(batch))
+                saved += len(batch)
+        
+        print(f"Saved {saved} processed chunks to {output_file}")
+    
+    def load_processed_table(self, input_file: str) -> pa.Table:
+        """Memory-map a file written by save_processed_data as an Arrow table without parsing it"""
+        return pa.ipc.open_file(pa.memory_map(input_file)).read_all()
+    
+    def iter_processed_data(self, input_file: str) -> Iterator[Dict[str, Any]]:
+        """Stream chunks written by save_processed_data, one record batch at a time"""
+        for batch in self.load_processed_table(input_file).to_batches():
+            yield from record_batch_to_chunks(batch)
+    
+    def load_processed_data(self, input_file: str) -> List[Dict[str, Any]]:
+        """Load chunks written by save_processed_data"""
+        return list(self.iter_processed_data(input_file))
 
 def main():
     """Main function to process documents"""
@@ -170,9 +576,10 @@ def main():
     chunks_with_embeddings = processor.create_embeddings(chunks)
     
     # Save processed data
-    output_file = settings.DOCUMENTATION_FILE.replace('.json', '_processed.json')
+    output_file = settings.PROCESSED_FILE
     processor.save_processed_data(chunks_with_embeddings, output_file)
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    install_uvloop()
+    main()
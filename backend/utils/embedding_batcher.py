@@ -0,0 +1,60 @@
+import asyncio
+from typing import Awaitable, Callable, List, Set, Tuple
+
+from config.settings import settings
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text embedding requests into batched API calls"""
+
+    def __init__(self, embed_many: Callable[[List[str]], Awaitable[List[List[float]]]],
+                 batch_size: int = None, flush_interval: float = None):
+        self.embed_many = embed_many
+        self.batch_size = batch_size or settings.QUERY_EMBEDDING_BATCH_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.QUERY_EMBEDDING_FLUSH_INTERVAL
+
+        self.pending: List[Tuple[str, asyncio.Future]] = []
+        self.flush_handle = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text and wait for its embedding from the next flushed batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((text, future))
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+        return await future
+
+    def flush(self):
+        """Send all pending texts as one embedding request"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+
+        # Keep a reference so the task is not garbage collected mid-flight
+        task = asyncio.ensure_future(self._run(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Embed a batch and resolve each waiting caller"""
+        try:
+            embeddings = await self.embed_many([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
@@ -0,0 +1,108 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Compiled versions of the document cleaning and chunking loops in document_processor"""
+
+from cpython.mem cimport PyMem_Malloc, PyMem_Free
+from cpython.unicode cimport Py_UNICODE_ISALNUM, Py_UNICODE_ISSPACE
+
+
+cdef extern from "Python.h":
+    int PyUnicode_4BYTE_KIND
+    object PyUnicode_FromKindAndData(int kind, const void *buffer, Py_ssize_t size)
+
+
+cdef inline bint is_sentence_mark(Py_UCS4 ch):
+    return ch == u'.' or ch == u'!' or ch == u'?'
+
+
+cdef inline bint is_allowed(Py_UCS4 ch):
+    # Mirrors [\w\s.,!?;:\-()] from CLEAN_TEXT_RE
+    return (Py_UNICODE_ISALNUM(ch) or Py_UNICODE_ISSPACE(ch) or ch == u'_' or is_sentence_mark(ch)
+            or ch == u',' or ch == u';' or ch == u':' or ch == u'-' or ch == u'(' or ch == u')')
+
+
+cpdef str clean_text(str text):
+    """Collapse whitespace, blank out special characters and squash repeated punctuation in one pass"""
+    cdef Py_ssize_t n = len(text)
+    cdef Py_ssize_t i = 0, size = 0
+    cdef Py_UCS4 ch
+    cdef Py_UCS4 *out = <Py_UCS4 *> PyMem_Malloc(max(n, 1) * sizeof(Py_UCS4))
+    if out == NULL:
+        raise MemoryError()
+
+    try:
+        while i < n:
+            ch = text[i]
+            if Py_UNICODE_ISSPACE(ch):
+                # Whitespace runs become one space
+                while i < n and Py_UNICODE_ISSPACE(text[i]):
+                    i += 1
+                out[size] = u' '
+            elif is_sentence_mark(ch):
+                # Punctuation runs keep their last mark
+                while i < n and is_sentence_mark(text[i]):
+                    ch = text[i]
+                    i += 1
+                out[size] = ch
+            else:
+                # Each disallowed character becomes a space
+                out[size] = ch if is_allowed(ch) else u' '
+                i += 1
+            size += 1
+
+        return PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, out, size).strip()
+    finally:
+        PyMem_Free(out)
+
+
+cdef Py_ssize_t rfind_char(str text, Py_UCS4 target, Py_ssize_t start, Py_ssize_t end):
+    cdef Py_ssize_t i = end - 1
+    while i >= start:
+        if text[i] == target:
+            return i
+        i -= 1
+    return -1
+
+
+cpdef list chunk_spans(str text, Py_ssize_t chunk_size, Py_ssize_t overlap):
+    """Split text into overlapping (start, end) spans, preferring sentence then word boundaries"""
+    cdef Py_ssize_t n = len(text)
+    cdef Py_ssize_t start = 0, end, boundary, found, chunk_start, chunk_end
+    cdef list spans = []
+
+    if n <= chunk_size:
+        return [(0, n)]
+
+    while start < n:
+        end = start + chunk_size
+
+        if end < n:
+            # Only breaks in the second half of the window are accepted, so only scan that
+            boundary = start + chunk_size // 2 + 1
+            found = rfind_char(text, u'.', boundary, end)
+            if found != -1:
+                end = found + 1
+            else:
+                found = rfind_char(text, u' ', boundary, end)
+                if found != -1:
+                    end = found
+
+        # Trim surrounding whitespace without slicing
+        chunk_start = start
+        chunk_end = end if end < n else n
+        while chunk_start < chunk_end and Py_UNICODE_ISSPACE(text[chunk_start]):
+            chunk_start += 1
+        while chunk_end > chunk_start and Py_UNICODE_ISSPACE(text[chunk_end - 1]):
+            chunk_end -= 1
+        if chunk_start < chunk_end:
+            spans.append((chunk_start, chunk_end))
+
+        start = end - overlap
+        if start >= n:
+            break
+
+    return spans
+
+
+cpdef list chunk_text(str text, Py_ssize_t chunk_size, Py_ssize_t overlap):
+    """Split text into overlapping chunks, preferring sentence then word boundaries"""
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, overlap)]
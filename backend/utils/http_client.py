@@ -0,0 +1,48 @@
+import asyncio
+from functools import cache
+
+import httpx
+from config.settings import settings
+
+
+def http_limits() -> httpx.Limits:
+    """Connection pool limits shared by the sync and async clients"""
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+    )
+
+
+@cache
+def get_http_client() -> httpx.Client:
+    """Process-wide pooled HTTP/2 client shared by the sync API clients"""
+    return httpx.Client(http2=True, timeout=settings.HTTP_TIMEOUT, limits=http_limits())
+
+
+@cache
+def get_async_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled HTTP/2 client shared by the async API clients"""
+    return httpx.AsyncClient(http2=True, timeout=settings.HTTP_TIMEOUT, limits=http_limits())
+
+
+async def close_async_http_client():
+    """Close the shared client and let the next caller create a fresh one"""
+    if get_async_http_client.cache_info().currsize:
+        await get_async_http_client().aclose()
+        get_async_http_client.cache_clear()
+
+
+def close_http_client():
+    """Close the shared sync client and let the next caller create a fresh one"""
+    if get_http_client.cache_info().currsize:
+        get_http_client().close()
+        get_http_client.cache_clear()
+
+
+def install_uvloop():
+    """Run asyncio on uvloop when it is installed (it is not available on Windows)"""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
@@ -0,0 +1,58 @@
+import os
+import threading
+from typing import Any, Dict, Iterable, List
+
+import lmdb
+import msgpack
+from config.settings import settings
+
+
+# Chunk fields kept locally instead of in Pinecone metadata
+METADATA_FIELDS = ('text', 'url', 'title', 'chunk_index', 'total_chunks', 'word_count')
+
+# LMDB refuses to open the same path twice in one process, so stores share one environment per path
+_environments: Dict[str, lmdb.Environment] = {}
+_environments_lock = threading.Lock()
+
+
+def open_environment(path: str, map_size: int) -> lmdb.Environment:
+    """Process-wide LMDB environment for a path, opened on first use"""
+    path = os.path.abspath(path)
+    with _environments_lock:
+        if path not in _environments:
+            os.makedirs(path, exist_ok=True)
+            _environments[path] = lmdb.open(path, map_size=map_size)
+        return _environments[path]
+
+
+def close_environments():
+    """Close the shared environments and let the next store open fresh ones"""
+    with _environments_lock:
+        for env in _environments.values():
+            env.close()
+        _environments.clear()
+
+
+class ChunkMetadataStore:
+    """Local LMDB store of chunk text and metadata keyed by chunk id"""
+
+    def __init__(self, path: str = None, map_size: int = None):
+        self.path = path or settings.METADATA_DB_PATH
+        self.env = open_environment(self.path, map_size or settings.METADATA_DB_MAP_SIZE)
+
+    def put_many(self, chunks: Iterable[Dict[str, Any]]):
+        """Store metadata for chunks in a single write transaction"""
+        with self.env.begin(write=True) as txn:
+            for chunk in chunks:
+                record = {field: chunk[field] for field in METADATA_FIELDS}
+                txn.put(chunk['id'].encode(), msgpack.packb(record, use_bin_type=True))
+
+    def get_many(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch metadata for chunk ids in a single read transaction; unknown ids are omitted"""
+        records = {}
+        with self.env.begin() as txn:
+            for chunk_id in ids:
+                data = txn.get(chunk_id.encode())
+                if data is not None:
+                    records[chunk_id] = msgpack.unpackb(data, raw=False)
+        return records
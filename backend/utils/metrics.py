@@ -0,0 +1,38 @@
+import time
+from contextlib import contextmanager
+
+from opentelemetry import trace
+from prometheus_client import Counter, Histogram
+
+
+tracer = trace.get_tracer("mcp-chatbot")
+
+RAG_STEP_LATENCY = Histogram(
+    "rag_step_latency_seconds",
+    "Latency of individual RAG pipeline steps",
+    ["step"]
+)
+CACHE_COUNTERS = {
+    cache: (
+        Counter(f"{cache}_cache_hits_total", f"{cache.capitalize()} answer cache hits"),
+        Counter(f"{cache}_cache_misses_total", f"{cache.capitalize()} answer cache misses")
+    )
+    for cache in ("exact", "semantic")
+}
+
+
+@contextmanager
+def timed_step(step: str):
+    """Trace a pipeline step as a span and record its latency"""
+    with tracer.start_as_current_span(f"rag.{step}"):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            RAG_STEP_LATENCY.labels(step=step).observe(time.perf_counter() - start)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a hit or miss for the named answer cache"""
+    hits, misses = CACHE_COUNTERS[cache]
+    (hits if hit else misses).inc()
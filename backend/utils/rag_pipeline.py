@@ -1,33 +1,79 @@
+import re
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from utils.vector_store import PineconeVectorStore
 from config.settings import settings
+from utils.http_client import get_http_client, get_async_http_client
+from utils.metrics import timed_step
+
+
+SYSTEM_PROMPT = """You are an expert assistant specializing in Model Context Protocol (MCP). 
+You help developers understand MCP concepts, implement MCP solutions, and troubleshoot MCP-related issues.
+
+Your responses should be:
+1. Accurate and based on the provided context
+2. Developer-focused with practical examples when relevant
+3. Clear and well-structured
+4. Honest about limitations - if you don't know something, say so
+
+When answering questions:
+- Use the provided context as your primary source of information
+- If the context doesn't contain enough information, acknowledge this
+- Provide code examples when relevant and available in the context
+- Reference specific parts of the documentation when helpful
+- Suggest next steps or related topics when appropriate"""
+
+# Static instructions come before the retrieved context and the question comes last,
+# so the longest possible prompt prefix is identical across requests
+USER_PROMPT_TEMPLATE = """Based on the following context about Model Context Protocol (MCP), please answer the user's question. Please provide a comprehensive answer based on the context provided. If the context doesn't contain enough information to fully answer the question, please say so and provide what information you can.
+
+Context:
+{context}
+
+Question: {query}"""
+
+# A '.'-delimited sentence that opens with a question word
+QUESTION_RE = re.compile(r'(?:^|(?<=\.))\s*((?:how|what|when|where|why|which)\b[^.]*)', re.IGNORECASE)
 
 
 class RAGPipeline:
     """RAG (Retrieval-Augmented Generation) pipeline for MCP Q&A"""
     
-    def __init__(self):
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.vector_store = PineconeVectorStore()
+    def __init__(self, vector_store: Optional[PineconeVectorStore] = None):
+        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY, http_client=get_http_client())
+        self.async_openai_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=get_async_http_client()
+        )
+        self.vector_store = vector_store or PineconeVectorStore()
         
-    def retrieve_context(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+    def retrieve_context(self, query: str, top_k: int = None,
+                         query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """Retrieve relevant context from vector store"""
         if top_k is None:
             top_k = settings.TOP_K_RESULTS
         
-        results = self.vector_store.search(query, top_k=top_k)
+        results = self.vector_store.search(query, top_k=top_k, query_embedding=query_embedding)
         return results
     
+    async def aretrieve_context(self, query: str, top_k: int = None,
+                                query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Retrieve relevant context from vector store without blocking the event loop"""
+        if top_k is None:
+            top_k = settings.TOP_K_RESULTS
+        
+        return await self.vector_store.asearch(query, top_k=top_k, query_embedding=query_embedding)
+    
     def format_context(self, retrieved_docs: List[Dict[str, Any]]) -> str:
         """Format retrieved documents into context string"""
         if not retrieved_docs:
             return "No relevant context found."
         
+        # Order by document id rather than score so the same documents always render
+        # identically, whatever query retrieved them
         context_parts = []
-        for i, doc in enumerate(retrieved_docs, 1):
+        for doc in sorted(retrieved_docs, key=lambda doc: doc['id']):
             context_part = f"""
-Context {i} (Score: {doc['score']:.3f}):
 Title: {doc['title']}
 URL: {doc['url']}
 Content: {doc['text']}
@@ -36,44 +82,23 @@ Content: {doc['text']}
         
         return "\n".join(context_parts)
     
+    def build_messages(self, query: str, context: str) -> List[Dict[str, str]]:
+        """Build the chat messages for answering a query with retrieved context"""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": USER_PROMPT_TEMPLATE.format(context=context, query=query)}
+        ]
+    
     def generate_answer(self, query: str, context: str) -> str:
         """Generate answer using OpenAI with retrieved context"""
-        
-        system_prompt = """You are an expert assistant specializing in Model Context Protocol (MCP). 
-You help developers understand MCP concepts, implement MCP solutions, and troubleshoot MCP-related issues.
-
-Your responses should be:
-1. Accurate and based on the provided context
-2. Developer-focused with practical examples when relevant
-3. Clear and well-structured
-4. Honest about limitations - if you don't know something, say so
-
-When answering questions:
-- Use the provided context as your primary source of information
-- If the context doesn't contain enough information, acknowledge this
-- Provide code examples when relevant and available in the context
-- Reference specific parts of the documentation when helpful
-- Suggest next steps or related topics when appropriate"""
-
-        user_prompt = f"""Based on the following context about Model Context Protocol (MCP), please answer the user's question.
-
-Context:
-{context}
-
-Question: {query}
-
-Please provide a comprehensive answer based on the context provided. If the context doesn't contain enough information to fully answer the question, please say so and provide what information you can."""
-
         try:
-            response = self.openai_client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
+            with timed_step("llm_chat"):
+                response = self.openai_client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=self.build_messages(query, context),
+                    temperature=0.7,
+                    max_tokens=1000
+                )
             
             return response.choices[0].message.content
             
@@ -81,11 +106,29 @@ Please provide a comprehensive answer based on the context provided. If the cont
             print(f"Error generating answer: {e}")
             return "I apologize, but I encountered an error while generating the answer. Please try again."
     
-    def ask(self, query: str, include_sources: bool = True) -> Dict[str, Any]:
+    async def agenerate_answer(self, query: str, context: str) -> str:
+        """Generate answer using OpenAI without blocking the event loop"""
+        try:
+            with timed_step("llm_chat"):
+                response = await self.async_openai_client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=self.build_messages(query, context),
+                    temperature=0.7,
+                    max_tokens=1000
+                )
+            
+            return response.choices[0].message.content
+            
+        except Exception as e:
+            print(f"Error generating answer: {e}")
+            return "I apologize, but I encountered an error while generating the answer. Please try again."
+    
+    def ask(self, query: str, include_sources: bool = True, top_k: int = None,
+            query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
         """Complete RAG pipeline: retrieve context and generate answer"""
         
         # Retrieve relevant context
-        retrieved_docs = self.retrieve_context(query)
+        retrieved_docs = self.retrieve_context(query, top_k=top_k, query_embedding=query_embedding)
         
         # Format context
         context = self.format_context(retrieved_docs)
@@ -93,6 +136,21 @@ Please provide a comprehensive answer based on the context provided. If the cont
         # Generate answer
         answer = self.generate_answer(query, context)
         
+        return self.build_response(query, answer, retrieved_docs, include_sources)
+    
+    async def aask(self, query: str, include_sources: bool = True, top_k: int = None,
+                   query_embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+        """Async RAG pipeline: overlaps OpenAI and Pinecone I/O with other requests"""
+        retrieved_docs = await self.aretrieve_context(query, top_k=top_k, query_embedding=query_embedding)
+        context = self.format_context(retrieved_docs)
+        answer = await self.agenerate_answer(query, context)
+        
+        return self.build_response(query, answer, retrieved_docs, include_sources)
+    
+    def build_response(self, query: str, answer: str, retrieved_docs: List[Dict[str, Any]],
+                       include_sources: bool = True) -> Dict[str, Any]:
+        """Assemble the pipeline response from an answer and its retrieved context"""
+        
         # Prepare response
         response = {
             "query": query,
@@ -119,19 +177,16 @@ Please provide a comprehensive answer based on the context provided. If the cont
         retrieved_docs = self.retrieve_context(query, top_k=10)
         
         # Extract potential questions from high-scoring documents
-        similar_questions = []
+        similar_questions = set()
         for doc in retrieved_docs:
             if doc['score'] > threshold:
                 # Simple heuristic to extract question-like sentences
-                text = doc['text']
-                sentences = text.split('.')
-                for sentence in sentences:
-                    sentence = sentence.strip()
-                    if any(sentence.lower().startswith(q) for q in ['how', 'what', 'when', 'where', 'why', 'which']):
-                        if len(sentence) > 10 and len(sentence) < 100:
-                            similar_questions.append(sentence + '?')
-        
-        return list(set(similar_questions))[:5]  # Return top 5 unique questions
+                for match in QUESTION_RE.finditer(doc['text']):
+                    sentence = match.group(1).rstrip()
+                    if 10 < len(sentence) < 100:
+                        similar_questions.add(sentence + '?')
+        
+        return list(similar_questions)[:5]  # Return top 5 unique questions
 
 
 def main():
@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Sequence
+
+import numpy as np
+from config.settings import settings
+
+
+class SemanticCache:
+    """In-process cache of answers keyed by question embedding similarity"""
+
+    def __init__(self, max_size: int = None, threshold: float = None,
+                 ttl: float = None, dimension: int = None):
+        self.max_size = max_size or settings.SEMANTIC_CACHE_SIZE
+        self.threshold = threshold if threshold is not None else settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl if ttl is not None else settings.SEMANTIC_CACHE_TTL
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+
+        # One row per slot; empty and expired slots are masked out via expires_at
+        self.embeddings = np.zeros((self.max_size, self.dimension), dtype=np.float32)
+        self.expires_at = np.zeros(self.max_size, dtype=np.float64)
+        self.include_sources = np.zeros(self.max_size, dtype=bool)
+
+        # slot -> cached response, ordered from least to most recently used
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _normalize(self, embedding: Sequence[float]) -> np.ndarray:
+        """L2-normalize an embedding so the dot product is the cosine similarity"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: Sequence[float], include_sources: bool = True) -> Optional[Dict[str, Any]]:
+        """Return the cached response most similar to the embedding, if above threshold"""
+        query = self._normalize(embedding)
+
+        with self.lock:
+            if not self.entries:
+                return None
+
+            scores = self.embeddings @ query
+            valid = (self.expires_at > time.time()) & (self.include_sources == include_sources)
+            scores[~valid] = -1.0
+
+            slot = int(scores.argmax())
+            if scores[slot] < self.threshold:
+                return None
+
+            self.entries.move_to_end(slot)
+            return dict(self.entries[slot])
+
+    def insert(self, embedding: Sequence[float], response: Dict[str, Any],
+               include_sources: bool = True, ttl: float = None):
+        """Cache a response, evicting expired or least recently used entries when full"""
+        vector = self._normalize(embedding)
+
+        with self.lock:
+            slot = self._free_slot()
+            self.embeddings[slot] = vector
+            self.expires_at[slot] = time.time() + (ttl if ttl is not None else self.ttl)
+            self.include_sources[slot] = include_sources
+            self.entries[slot] = dict(response)
+
+    def _free_slot(self) -> int:
+        """Find an unused slot, reclaiming expired or LRU slots if needed"""
+        if len(self.entries) < self.max_size:
+            used = set(self.entries)
+            return next(i for i in range(self.max_size) if i not in used)
+
+        now = time.time()
+        for slot in self.entries:
+            if self.expires_at[slot] <= now:
+                del self.entries[slot]
+                return slot
+
+        slot, _ = self.entries.popitem(last=False)
+        return slot
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self.lock:
+            self.entries.clear()
+            self.expires_at[:] = 0
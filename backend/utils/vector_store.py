@@ -1,9 +1,27 @@
-import json
+import asyncio
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
+from cachetools import LRUCache
 from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
+from pinecone.exceptions import PineconeApiException, PineconeProtocolError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+from urllib3.exceptions import HTTPError
+from openai import OpenAI, AsyncOpenAI
 from config.settings import settings
+from utils.http_client import get_http_client, get_async_http_client
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.document_processor import DocumentProcessor, record_batch_to_chunks
+from utils.metadata_store import ChunkMetadataStore
+from utils.metrics import timed_step
+
+
+def is_retryable_pinecone_error(error: BaseException) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying; other errors won't go away"""
+    if isinstance(error, PineconeApiException):
+        return error.status == 429 or (error.status or 0) >= 500
+    return isinstance(error, (PineconeProtocolError, HTTPError))
 
 
 class PineconeVectorStore:
@@ -13,7 +31,17 @@ class PineconeVectorStore:
         self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
         self.index_name = settings.PINECONE_INDEX_NAME
         self.index = None
-        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY, http_client=get_http_client())
+        self.async_openai_client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            http_client=get_async_http_client()
+        )
+        self.query_batcher = EmbeddingBatcher(self.aembed_queries)
+        self.metadata_store = ChunkMetadataStore()
+        
+        # (model, query) -> embedding, so repeated queries skip the OpenAI round-trip
+        self.query_embeddings = LRUCache(maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE)
+        self.query_embeddings_lock = threading.Lock()
         
     def create_index(self, dimension: int = 1536, metric: str = "cosine"):
         """Create Pinecone index if it doesn't exist"""
@@ -26,15 +54,28 @@ class PineconeVectorStore:
             
             # Create new index
             print(f"Creating index '{self.index_name}'...")
-            self.pc.create_index(
-                name=self.index_name,
-                dimension=dimension,
-                metric=metric,
-                spec=ServerlessSpec(
+            if settings.PINECONE_INTEGRATED_INFERENCE:
+                # Pinecone embeds the chunk_text field itself on upsert and search
+                self.pc.create_index_for_model(
+                    name=self.index_name,
                     cloud="aws",
-                    region="us-east-1"
+                    region="us-east-1",
+                    embed={
+                        "model": settings.PINECONE_EMBED_MODEL,
+                        "field_map": {"text": "chunk_text"},
+                        "metric": metric
+                    }
+                )
+            else:
+                self.pc.create_index(
+                    name=self.index_name,
+                    dimension=dimension,
+                    metric=metric,
+                    spec=ServerlessSpec(
+                        cloud="aws",
+                        region="us-east-1"
+                    )
                 )
-            )
             
             # Wait for index to be ready
             while not self.pc.describe_index(self.index_name).status['ready']:
@@ -60,85 +101,265 @@ class PineconeVectorStore:
             print(f"Error connecting to index: {e}")
             raise
     
-    def upsert_documents(self, chunks: List[Dict[str, Any]], batch_size: int = 100):
-        """Upsert document chunks to Pinecone"""
+    def upsert_documents(self, chunks: List[Dict[str, Any]], batch_size: int = 100) -> int:
+        """Upsert document chunks to Pinecone, returning how many were upserted"""
         if not self.index:
             self.connect_to_index()
         
         print(f"Upserting {len(chunks)} chunks to Pinecone...")
         
+        if settings.PINECONE_INTEGRATED_INFERENCE:
+            batch_size = min(batch_size, 96)  # upsert_records limit for integrated indexes
+        
         # Prepare vectors for upsert
-        vectors = []
-        for chunk in chunks:
-            vector = {
-                'id': chunk['id'],
-                'values': chunk['embedding'],
-                'metadata': {
-                    'text': chunk['text'][:1000],  # Truncate for metadata limits
+        if settings.PINECONE_INTEGRATED_INFERENCE:
+            # Records are flat and Pinecone embeds chunk_text server-side
+            vectors = [
+                {
+                    'id': chunk['id'],
+                    'chunk_text': chunk['text'],
                     'url': chunk['url'],
                     'title': chunk['title'],
                     'chunk_index': chunk['chunk_index'],
                     'total_chunks': chunk['total_chunks'],
                     'word_count': chunk['word_count']
                 }
-            }
-            vectors.append(vector)
+                for chunk in chunks
+            ]
+        else:
+            # Text and metadata live in the local store; Pinecone only holds id and vector
+            self.metadata_store.put_many(chunks)
+            vectors = [{'id': chunk['id'], 'values': chunk['embedding']} for chunk in chunks]
+        
+        # Upsert batches concurrently; the Pinecone client is thread-safe
+        batches = [vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size)]
         
-        # Upsert in batches
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
+        def upsert(n: int, batch: List[Dict[str, Any]]) -> int:
             try:
-                self.index.upsert(vectors=batch)
-                print(f"Upserted batch {i//batch_size + 1}/{(len(vectors) + batch_size - 1)//batch_size}")
+                self.upsert_batch(batch)
+                print(f"Upserted batch {n + 1}/{len(batches)}")
+                return len(batch)
             except Exception as e:
-                print(f"Error upserting batch {i//batch_size + 1}: {e}")
+                print(f"Error upserting batch {n + 1}: {e}")
+                return 0
         
-        print(f"Successfully upserted {len(vectors)} vectors")
+        with ThreadPoolExecutor(max_workers=settings.PINECONE_MAX_CONCURRENCY) as executor:
+            upserted = sum(executor.map(upsert, range(len(batches)), batches))
+        
+        print(f"Successfully upserted {upserted}/{len(vectors)} vectors")
+        return upserted
     
-    def search(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+    @retry(
+        retry=retry_if_exception(is_retryable_pinecone_error),
+        wait=wait_random_exponential(multiplier=1, max=30),
+        stop=stop_after_attempt(settings.PINECONE_MAX_RETRIES),
+        reraise=True
+    )
+    def upsert_batch(self, batch: List[Dict[str, Any]]):
+        """Upsert one batch of vectors, retrying rate limits and transient errors with backoff"""
+        if settings.PINECONE_INTEGRATED_INFERENCE:
+            self.index.upsert_records(settings.PINECONE_NAMESPACE, batch)
+        else:
+            self.index.upsert(vectors=batch)
+    
+    def cached_query_embedding(self, query: str) -> Optional[List[float]]:
+        """Return a previously computed embedding for the query, if any"""
+        with self.query_embeddings_lock:
+            return self.query_embeddings.get((settings.OPENAI_EMBEDDING_MODEL, query))
+    
+    def cache_query_embeddings(self, queries: List[str], embeddings: List[List[float]]):
+        """Remember query embeddings for later searches"""
+        with self.query_embeddings_lock:
+            for query, embedding in zip(queries, embeddings):
+                self.query_embeddings[(settings.OPENAI_EMBEDDING_MODEL, query)] = embedding
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Create an embedding for a search query"""
+        return self.embed_queries([query])[0]
+    
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Create embeddings for several queries, requesting only uncached ones in a single API call"""
+        embeddings = [self.cached_query_embedding(query) for query in queries]
+        misses = [query for query, embedding in zip(queries, embeddings) if embedding is None]
+        
+        if misses:
+            with timed_step("embed"):
+                response = self.openai_client.embeddings.create(
+                    model=settings.OPENAI_EMBEDDING_MODEL,
+                    input=misses
+                )
+            fresh = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            self.cache_query_embeddings(misses, fresh)
+            
+            fresh = iter(fresh)
+            embeddings = [embedding if embedding is not None else next(fresh) for embedding in embeddings]
+        
+        return embeddings
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """Create an embedding for a search query, batched with concurrent queries"""
+        embedding = self.cached_query_embedding(query)
+        if embedding is not None:
+            return embedding
+        
+        return await self.query_batcher.embed(query)
+    
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Create embeddings for several queries, requesting only uncached ones in a single API call"""
+        embeddings = [self.cached_query_embedding(query) for query in queries]
+        misses = [query for query, embedding in zip(queries, embeddings) if embedding is None]
+        
+        if misses:
+            with timed_step("embed"):
+                response = await self.async_openai_client.embeddings.create(
+                    model=settings.OPENAI_EMBEDDING_MODEL,
+                    input=misses
+                )
+            fresh = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            self.cache_query_embeddings(misses, fresh)
+            
+            fresh = iter(fresh)
+            embeddings = [embedding if embedding is not None else next(fresh) for embedding in embeddings]
+        
+        return embeddings
+    
+    def query_index(self, query_embedding: List[float], top_k: int = None) -> List[Dict[str, Any]]:
+        """Query Pinecone with an embedding and format the matches"""
         if not self.index:
             self.connect_to_index()
         
         if top_k is None:
             top_k = settings.TOP_K_RESULTS
         
-        try:
-            # Create query embedding
-            response = self.openai_client.embeddings.create(
-                model=settings.OPENAI_EMBEDDING_MODEL,
-                input=query
-            )
-            query_embedding = response.data[0].embedding
-            
-            # Search in Pinecone
+        # Search in Pinecone
+        with timed_step("pinecone_query"):
             search_response = self.index.query(
                 vector=query_embedding,
                 top_k=top_k,
-                include_metadata=True
+                include_metadata=False
             )
+        
+        # Hydrate text and metadata for all matches from the local store
+        matches = search_response['matches']
+        metadata = self.metadata_store.get_many([match['id'] for match in matches])
+        
+        # Format results
+        results = []
+        for match in matches:
+            if match['id'] not in metadata:
+                print(f"No local metadata for chunk '{match['id']}', skipping")
+                continue
             
-            # Format results
-            results = []
-            for match in search_response['matches']:
-                result = {
-                    'id': match['id'],
-                    'score': match['score'],
-                    'text': match['metadata']['text'],
-                    'url': match['metadata']['url'],
-                    'title': match['metadata']['title'],
-                    'chunk_index': match['metadata']['chunk_index'],
-                    'total_chunks': match['metadata']['total_chunks'],
-                    'word_count': match['metadata']['word_count']
-                }
-                results.append(result)
+            result = {'id': match['id'], 'score': match['score'], **metadata[match['id']]}
+            results.append(result)
+        
+        return results
+    
+    def search_records(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+        """Query an integrated-inference index with raw text and format the hits"""
+        if not self.index:
+            self.connect_to_index()
+        
+        if top_k is None:
+            top_k = settings.TOP_K_RESULTS
+        
+        # Pinecone embeds the query itself, so there is no OpenAI round-trip
+        with timed_step("pinecone_query"):
+            search_response = self.index.search(
+                namespace=settings.PINECONE_NAMESPACE,
+                query={"inputs": {"text": query}, "top_k": top_k}
+            )
+        
+        # Format results
+        results = []
+        for hit in search_response['result']['hits']:
+            fields = hit['fields']
+            result = {
+                'id': hit['_id'],
+                'score': hit['_score'],
+                'text': fields['chunk_text'],
+                'url': fields['url'],
+                'title': fields['title'],
+                'chunk_index': fields['chunk_index'],
+                'total_chunks': fields['total_chunks'],
+                'word_count': fields['word_count']
+            }
+            results.append(result)
+        
+        return results
+    
+    async def aquery(self, query_embedding: List[float], top_k: int = None) -> List[Dict[str, Any]]:
+        """Query Pinecone without blocking the event loop"""
+        # The Pinecone client is synchronous, so run the query in a worker thread
+        return await asyncio.to_thread(self.query_index, query_embedding, top_k)
+    
+    def search(self, query: str, top_k: int = None,
+               query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents"""
+        try:
+            if settings.PINECONE_INTEGRATED_INFERENCE:
+                return self.search_records(query, top_k=top_k)
+            
+            # Create query embedding unless the caller already has one
+            if query_embedding is None:
+                query_embedding = self.embed_query(query)
+            
+            return self.query_index(query_embedding, top_k=top_k)
+            
+        except Exception as e:
+            print(f"Error searching: {e}")
+            return []
+    
+    async def asearch(self, query: str, top_k: int = None,
+                      query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Search for similar documents without blocking the event loop"""
+        try:
+            if settings.PINECONE_INTEGRATED_INFERENCE:
+                return await asyncio.to_thread(self.search_records, query, top_k)
             
-            return results
+            if query_embedding is None:
+                query_embedding = await self.aembed_query(query)
+            
+            return await self.aquery(query_embedding, top_k=top_k)
             
         except Exception as e:
             print(f"Error searching: {e}")
             return []
     
+    def search_many(self, queries: List[str], top_k: int = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with one embedding call and concurrent Pinecone queries"""
+        try:
+            if settings.PINECONE_INTEGRATED_INFERENCE:
+                with ThreadPoolExecutor(max_workers=min(len(queries), settings.PINECONE_MAX_CONCURRENCY)) as executor:
+                    return list(executor.map(lambda query: self.search_records(query, top_k=top_k), queries))
+            
+            query_embeddings = self.embed_queries(queries)
+            
+            with ThreadPoolExecutor(max_workers=min(len(queries), settings.PINECONE_MAX_CONCURRENCY)) as executor:
+                return list(executor.map(lambda embedding: self.query_index(embedding, top_k=top_k), query_embeddings))
+            
+        except Exception as e:
+            print(f"Error searching: {e}")
+            return [[] for _ in queries]
+    
+    async def asearch_many(self, queries: List[str], top_k: int = None) -> List[List[Dict[str, Any]]]:
+        """Search for several queries without blocking the event loop"""
+        try:
+            if settings.PINECONE_INTEGRATED_INFERENCE:
+                return list(await asyncio.gather(*[
+                    asyncio.to_thread(self.search_records, query, top_k) for query in queries
+                ]))
+            
+            query_embeddings = await self.aembed_queries(queries)
+            
+            return list(await asyncio.gather(*[
+                self.aquery(embedding, top_k=top_k) for embedding in query_embeddings
+            ]))
+            
+        except Exception as e:
+            print(f"Error searching: {e}")
+            return [[] for _ in queries]
+    
     def delete_index(self):
         """Delete the index"""
         try:
@@ -171,15 +392,15 @@ def main():
     vector_store.create_index()
     
     # Load processed documents
-    processed_file = settings.DOCUMENTATION_FILE.replace('.json', '_processed.json')
+    processed_file = settings.PROCESSED_FILE
     try:
-        with open(processed_file, 'r', encoding='utf-8') as f:
-            chunks = json.load(f)
+        table = DocumentProcessor().load_processed_table(processed_file)
         
-        print(f"Loaded {len(chunks)} processed chunks")
+        print(f"Loaded {table.num_rows} processed chunks")
         
-        # Upsert to Pinecone
-        vector_store.upsert_documents(chunks)
+        # Upsert to Pinecone a record batch at a time, widening embeddings to float32 only here
+        for batch in table.to_batches():
+            vector_store.upsert_documents(record_batch_to_chunks(batch))
         
         # Show stats
         stats = vector_store.get_index_stats()
@@ -3,6 +3,7 @@ import type {
   QuestionResponse,
   IngestRequest,
   IngestResponse,
+  IngestJob,
   HealthResponse,
 } from "../types/api";
 
@@ -44,11 +45,31 @@ class ApiService {
     });
   }
 
-  async ingestDocuments(request: IngestRequest): Promise<IngestResponse> {
-    return this.request<IngestResponse>("/ingest", {
+  async ingestDocuments(
+    request: IngestRequest,
+    pollInterval = 2000,
+    timeout = 2 * 60 * 60 * 1000
+  ): Promise<IngestResponse> {
+    let job = await this.request<IngestJob>("/ingest", {
       method: "POST",
       body: JSON.stringify(request),
     });
+
+    // Ingestion runs in the background; poll until the job finishes or we give up
+    const deadline = Date.now() + timeout;
+    while (job.status === "queued" || job.status === "running") {
+      if (Date.now() >= deadline) {
+        throw new Error(`Ingestion job ${job.job_id} still ${job.status} after ${timeout / 1000}s`);
+      }
+      await new Promise((resolve) => setTimeout(resolve, pollInterval));
+      job = await this.request<IngestJob>(`/ingest/${job.job_id}`);
+    }
+
+    if (!job.result) {
+      throw new Error(`Ingestion job ${job.job_id} ${job.status} without a result`);
+    }
+
+    return job.result;
   }
 
   async getHealth(): Promise<HealthResponse> {
@@ -33,6 +33,12 @@ export interface IngestResponse {
   processing_time: number;
 }
 
+export interface IngestJob {
+  job_id: string;
+  status: "queued" | "running" | "completed" | "failed";
+  result?: IngestResponse | null;
+}
+
 export interface HealthResponse {
   status: string;
   timestamp: string;